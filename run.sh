@@ -6,23 +6,31 @@ echo "Carbon Footprint Analyzer"
 echo "=============================="
 echo ""
 
-# Check if Ollama is installed
-if ! command -v ollama &> /dev/null; then
-    echo "[ERROR] Ollama is not installed"
-    echo "Please install Ollama from: https://ollama.ai/"
-    exit 1
+# When serving with llama.cpp's llama-server (see docker-compose.yml), Ollama is not needed
+if [ "${LLM_API:-ollama}" = "openai" ]; then
+    echo "[OK] Using OpenAI-compatible server at ${OLLAMA_BASE_URL:-http://localhost:11434}"
+    echo ""
+else
+    # Check if Ollama is installed
+    if ! command -v ollama &> /dev/null; then
+        echo "[ERROR] Ollama is not installed"
+        echo "Please install Ollama from: https://ollama.ai/"
+        exit 1
+    fi
+
+    # Check if the model is available (quantized Llama3 8B unless OLLAMA_MODEL is set)
+    OLLAMA_MODEL="${OLLAMA_MODEL:-llama3:8b-instruct-q4_K_M}"
+    export OLLAMA_MODEL
+    if ! ollama list | grep -q "$OLLAMA_MODEL"; then
+        echo "[WARNING] $OLLAMA_MODEL model not found"
+        echo "Pulling model (this may take a few minutes)..."
+        ollama pull "$OLLAMA_MODEL"
+    fi
+
+    echo "[OK] Ollama is ready"
+    echo ""
 fi
 
-# Check if llama3:8b model is available
-if ! ollama list | grep -q "llama3:8b"; then
-    echo "[WARNING] llama3:8b model not found"
-    echo "Pulling model (this may take a few minutes)..."
-    ollama pull llama3:8b
-fi
-
-echo "[OK] Ollama is ready"
-echo ""
-
 # Check Python dependencies
 echo "Checking dependencies..."
 pip install -q -r requirements.txt
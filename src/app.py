@@ -4,9 +4,22 @@ Powered by Ollama Llama3:8b
 """
 
 import streamlit as st
-import json
+import numpy as np
+import threading
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from src.data.emissions import EMISSIONS, TARGETS, GRID_INTENSITY
+from src.data.emissions import (
+    EMISSIONS,
+    TARGETS,
+    GRID_INTENSITY,
+    TRANSPORT_KEYS,
+    TRANSPORT_FACTORS,
+    DIET_KEYS,
+    DIET_FACTORS,
+    HEATING_KEYS,
+    HEATING_FACTORS
+)
 from src.services.climate_data import ClimateDataService
 from src.services.database import CarbonFootprintDB
 from src.services.llm import OllamaService
@@ -61,21 +74,41 @@ st.markdown("""
 # Initialize services
 @st.cache_resource
 def init_services():
+    db = CarbonFootprintDB('data/carbon_footprint.db')
+    # Responses persist in the database, so repeated analyses survive restarts
+    llm = OllamaService(store=db)
+    # Load the model in the background so the first analysis skips the cold start
+    threading.Thread(target=llm.preload, daemon=True).start()
     return {
-        'climate': ClimateDataService(),
-        'db': CarbonFootprintDB('data/carbon_footprint.db'),
-        'llm': OllamaService()
+        'climate': ClimateDataService('data/climate_cache'),
+        'db': db,
+        'llm': llm
     }
 
 services = init_services()
 
+# Live climate data changes slowly; refetch at most every 15 minutes instead of on every rerun
+@st.cache_data(ttl=900, show_spinner=False)
+def load_climate_context():
+    return services['climate'].get_climate_context()
+
+@st.cache_data(ttl=900, show_spinner=False)
+def load_grid_intensity(region: str) -> float:
+    return services['climate'].get_electricity_carbon_intensity_estimate(region)
+
+# Dashboard aggregates shared by the Trends, AI Analysis and Goals tabs;
+# cleared whenever a new record is saved
+@st.cache_data(ttl=60, show_spinner=False)
+def load_dashboard(days: int = 30):
+    return services['db'].get_dashboard_bundle(days)
+
 # Header
 st.markdown('<h1 class="main-header">Carbon Footprint Analyzer</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Track, Analyze & Reduce Your Environmental Impact with AI-Powered Insights</p>', unsafe_allow_html=True)
 
 # Fetch real-time climate data
 with st.spinner("Loading real-time climate data..."):
-    climate_context = services['climate'].get_climate_context()
+    climate_context = load_climate_context()
 
 # Sidebar - Climate Context
 with st.sidebar:
@@ -128,61 +161,69 @@ tab1, tab2, tab3, tab4 = st.tabs([
 with tab1:
     st.header("Calculate Your Daily Carbon Footprint")
 
-    col1, col2 = st.columns(2)
+    # Inputs live in a form so dragging a slider does not rerun the app;
+    # the results below update when the form is submitted
+    with st.form("calc_form"):
+        col1, col2 = st.columns(2)
 
-    with col1:
-        st.subheader("Transportation")
-        transport_mode = st.selectbox(
-            "Primary transport mode:",
-            options=list(EMISSIONS["transport"].keys()),
-            format_func=lambda x: x.replace('_', ' ').title()
-        )
-        distance = st.slider("Daily commute distance (km):", 0, 150, 20)
+        with col1:
+            st.subheader("Transportation")
+            transport_mode = st.selectbox(
+                "Primary transport mode:",
+                options=TRANSPORT_KEYS,
+                format_func=lambda x: x.replace('_', ' ').title()
+            )
+            distance = st.slider("Daily commute distance (km):", 0, 150, 20)
 
-        st.subheader("Diet")
-        diet_type = st.selectbox(
-            "Dietary pattern:",
-            options=list(EMISSIONS["diet"].keys()),
-            format_func=lambda x: x.replace('_', ' ').title()
-        )
+            st.subheader("Diet")
+            diet_type = st.selectbox(
+                "Dietary pattern:",
+                options=DIET_KEYS,
+                format_func=lambda x: x.replace('_', ' ').title()
+            )
 
-        st.subheader("Consumption (optional)")
-        buy_clothes = st.checkbox("Bought new clothes this month?")
-        streaming_hours = st.slider("Daily streaming/screen time (hours):", 0, 12, 3)
+            st.subheader("Consumption (optional)")
+            buy_clothes = st.checkbox("Bought new clothes this month?")
+            streaming_hours = st.slider("Daily streaming/screen time (hours):", 0, 12, 3)
 
-    with col2:
-        st.subheader("Heating")
-        heating_type = st.selectbox(
-            "Heating method:",
-            options=list(EMISSIONS["heating"].keys()),
-            format_func=lambda x: x.replace('_', ' ').title()
-        )
-        heating_hours = st.slider("Daily heating hours:", 0, 24, 6)
+        with col2:
+            st.subheader("Heating")
+            heating_type = st.selectbox(
+                "Heating method:",
+                options=HEATING_KEYS,
+                format_func=lambda x: x.replace('_', ' ').title()
+            )
+            heating_hours = st.slider("Daily heating hours:", 0, 24, 6)
 
-        st.subheader("Electricity")
-        electricity_kwh = st.slider("Daily electricity use (kWh):", 0, 50, 12)
+            st.subheader("Electricity")
+            electricity_kwh = st.slider("Daily electricity use (kWh):", 0, 50, 12)
 
-    # Calculate emissions
-    transport_emissions = EMISSIONS["transport"][transport_mode] * distance
-    diet_emissions = EMISSIONS["diet"][diet_type]
-    heating_emissions = EMISSIONS["heating"][heating_type] * heating_hours
+        st.form_submit_button("Calculate", type="primary", use_container_width=True)
 
     # Get region-specific grid intensity
-    grid_intensity = services['climate'].get_electricity_carbon_intensity_estimate(user_region)
-    electricity_emissions = grid_intensity * electricity_kwh
-
-    consumption_emissions = 0
+    grid_intensity = load_grid_intensity(user_region)
+
+    # Calculate emissions: per-unit factors times daily quantities, one entry per category
+    factors = np.array([
+        TRANSPORT_FACTORS[TRANSPORT_KEYS.index(transport_mode)],
+        DIET_FACTORS[DIET_KEYS.index(diet_type)],
+        HEATING_FACTORS[HEATING_KEYS.index(heating_type)],
+        grid_intensity,
+        EMISSIONS["consumption"]["streaming_hours_daily"]
+    ])
+    quantities = np.array([distance, 1.0, heating_hours, electricity_kwh, streaming_hours])
+    category_emissions = factors * quantities
     if buy_clothes:
-        consumption_emissions += EMISSIONS["consumption"]["new_clothes_monthly"] / 30
-    consumption_emissions += EMISSIONS["consumption"]["streaming_hours_daily"] * streaming_hours
-
-    total_emissions = (
-        transport_emissions +
-        diet_emissions +
-        heating_emissions +
-        electricity_emissions +
+        category_emissions[4] += EMISSIONS["consumption"]["new_clothes_monthly"] / 30
+
+    total_emissions = float(category_emissions.sum())
+    (
+        transport_emissions,
+        diet_emissions,
+        heating_emissions,
+        electricity_emissions,
         consumption_emissions
-    )
+    ) = category_emissions.tolist()
 
     breakdown = {
         'Transport': transport_emissions,
@@ -191,6 +232,7 @@ with tab1:
         'Electricity': electricity_emissions,
         'Consumption': consumption_emissions
     }
+    biggest_category = max(breakdown.items(), key=itemgetter(1))[0]
 
     # Display results
     st.divider()
@@ -252,7 +294,7 @@ with tab1:
     # Save to database
     if st.button("Save This Calculation", type="primary", use_container_width=True):
         footprint_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': int(datetime.now().timestamp()),
             'total_emissions': total_emissions,
             'transport_emissions': transport_emissions,
             'diet_emissions': diet_emissions,
@@ -271,13 +313,15 @@ with tab1:
         }
 
         record_id = services['db'].save_footprint(footprint_data)
+        load_dashboard.clear()
         st.success(f"Saved! Record ID: {record_id}. View trends in the 'Trends & History' tab.")
 
 # TAB 2: Trends & History
 with tab2:
     st.header("Your Carbon Footprint Trends")
 
-    stats = services['db'].get_statistics(30)
+    dashboard = load_dashboard(30)
+    stats = dashboard['statistics']
 
     if stats.get('record_count', 0) > 0:
         # Summary metrics
@@ -286,13 +330,13 @@ with tab2:
             st.plotly_chart(fig_metrics, use_container_width=True)
 
         # Trend chart
-        trend_data = services['db'].get_trend_data(30)
-        if trend_data:
+        trend_data = dashboard['trend']
+        if len(trend_data):
             fig_trend = create_trend_chart(trend_data, TARGETS['paris_agreement_daily'])
             st.plotly_chart(fig_trend, use_container_width=True)
 
         # Category breakdown
-        category_avg = services['db'].get_category_breakdown(30)
+        category_avg = dashboard['category_breakdown']
         if category_avg and breakdown:
             fig_cat = create_category_comparison(breakdown, category_avg)
             st.plotly_chart(fig_cat, use_container_width=True)
@@ -317,7 +361,7 @@ with tab2:
         with st.expander("View Recent Records"):
             recent = services['db'].get_recent_records(10)
             for record in recent:
-                st.write(f"**{record['timestamp'][:10]}**: {record['total_emissions']:.2f} kg CO₂ - {record['notes'] or 'No notes'}")
+                st.write(f"**{datetime.fromtimestamp(record['timestamp']):%Y-%m-%d}**: {record['total_emissions']:.2f} kg CO₂ - {record['notes'] or 'No notes'}")
 
     else:
         st.info("No historical data yet. Calculate and save your footprint in the 'Calculate Footprint' tab to start tracking trends!")
@@ -355,42 +399,79 @@ with tab3:
                 'electricity_kwh': electricity_kwh
             }
 
-            with st.spinner("Llama3:8b is analyzing your carbon footprint..."):
-                if analysis_type == "Comprehensive Analysis":
-                    stats = services['db'].get_statistics(30) if services['db'].get_statistics(30).get('record_count', 0) > 0 else None
-                    analysis = services['llm'].analyze_footprint(
-                        user_data,
-                        climate_context,
-                        stats,
-                        user_location or None,
-                        user_guidance or None
+            analysis_stream = None
+            analysis = ""
+            extra_prompts = {}
+
+            if analysis_type == "Comprehensive Analysis":
+                stats = dashboard['statistics'] if dashboard['statistics'].get('record_count', 0) > 0 else None
+                analysis_stream = services['llm'].analyze_footprint(
+                    user_data,
+                    climate_context,
+                    stats,
+                    user_location or None,
+                    user_guidance or None,
+                    stream=True
+                )
+
+                # Independent follow-ups, generated concurrently with the main analysis
+                extra_prompts["Quick Wins"] = services['llm'].create_quick_tips_prompt(
+                    total_emissions,
+                    biggest_category,
+                    user_guidance or None
+                )
+                if stats:
+                    extra_prompts["Action Plan Preview"] = services['llm'].create_goal_setting_prompt(
+                        stats['avg_daily_emissions'],
+                        TARGETS['paris_agreement_daily']
                     )
-                elif analysis_type == "Compare with Previous":
-                    recent = services['db'].get_recent_records(2)
-                    if len(recent) >= 2:
-                        prev_total = recent[1]['total_emissions']
-                        analysis = services['llm'].compare_footprints(
-                            total_emissions,
-                            prev_total,
-                            breakdown
-                        )
-                    else:
-                        analysis = "Not enough historical data for comparison. Save more records first!"
+            elif analysis_type == "Compare with Previous":
+                recent = services['db'].get_recent_records(2)
+                if len(recent) >= 2:
+                    prev_total = recent[1]['total_emissions']
+                    analysis_stream = services['llm'].compare_footprints(
+                        total_emissions,
+                        prev_total,
+                        breakdown,
+                        stream=True
+                    )
+                else:
+                    analysis = "Not enough historical data for comparison. Save more records first!"
+            else:
+                # Quick tips
+                quick_prompt = services['llm'].create_quick_tips_prompt(
+                    total_emissions,
+                    biggest_category,
+                    user_guidance or None
+                )
+                analysis_stream = services['llm'].stream_response(quick_prompt)
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                # The record the insight is saved against, looked up while the model generates
+                latest_future = executor.submit(services['db'].get_recent_records, 1)
+                extras_future = None
+                if extra_prompts:
+                    extras_future = executor.submit(services['llm'].generate_many, list(extra_prompts.values()))
+
+                st.markdown("### AI Analysis Results")
+                if analysis_stream is not None:
+                    with st.spinner("Llama3:8b is analyzing your carbon footprint..."):
+                        analysis = st.write_stream(analysis_stream)
                 else:
-                    # Quick tips
-                    quick_prompt = f"Give 3 quick, actionable tips to reduce a {total_emissions:.1f} kg CO₂/day footprint. The biggest contributor is {max(breakdown, key=breakdown.get)}. Be specific and brief."
-                    if user_guidance:
-                        quick_prompt += f"\n\nUser's specific context/goals: {user_guidance}"
-                    analysis = services['llm'].generate_response(quick_prompt)
+                    st.markdown(analysis)
 
-            st.markdown("### AI Analysis Results")
-            st.markdown(analysis)
+                if extras_future is not None:
+                    with st.spinner("Finishing follow-up suggestions..."):
+                        extras = extras_future.result()
+                    for title, text in zip(extra_prompts, extras):
+                        st.markdown(f"#### {title}")
+                        st.markdown(text)
 
             # Save insight to database
             if analysis and not analysis.startswith("Error"):
-                recent_records = services['db'].get_recent_records(1)
+                recent_records = latest_future.result()
                 if recent_records:
-                    services['db'].save_llm_insight(recent_records[0]['id'], analysis)
+                    services['db'].save_llm_insight(recent_records[0]['id'], analysis, services['llm'].model)
 
     else:
         st.warning("Calculate your footprint first in the 'Calculate Footprint' tab!")
@@ -399,7 +480,7 @@ with tab3:
 with tab4:
     st.header("Set Goals & Create Your Action Plan")
 
-    stats = services['db'].get_statistics(30)
+    stats = dashboard['statistics']
 
     if stats.get('record_count', 0) > 0:
         current_avg = stats['avg_daily_emissions']
@@ -436,11 +517,9 @@ with tab4:
             st.info(f"Good goal! You'd still be {target_emissions - TARGETS['paris_agreement_daily']:.1f} kg above the Paris target, but making progress.")
 
         if st.button("Generate 3-Month Action Plan", type="primary", use_container_width=True):
-            with st.spinner("Creating your personalized action plan..."):
-                action_plan = services['llm'].create_action_plan(current_avg, target_emissions)
-
             st.markdown("### Your Personalized Action Plan")
-            st.markdown(action_plan)
+            with st.spinner("Creating your personalized action plan..."):
+                st.write_stream(services['llm'].create_action_plan(current_avg, target_emissions, stream=True))
 
         # Progress visualization
         st.divider()
@@ -2,6 +2,8 @@
 Enhanced emissions data with regional factors and more detailed categories
 """
 
+import numpy as np
+
 EMISSIONS = {
     "transport": {
         "car_petrol": 0.192,
@@ -43,6 +45,17 @@ EMISSIONS = {
     }
 }
 
+# Lookup tables for the per-unit factors selected in the calculator
+# Index i of *_FACTORS is the factor for *_KEYS[i]
+TRANSPORT_KEYS = tuple(EMISSIONS["transport"])
+TRANSPORT_FACTORS = np.array([EMISSIONS["transport"][k] for k in TRANSPORT_KEYS])
+
+DIET_KEYS = tuple(EMISSIONS["diet"])
+DIET_FACTORS = np.array([EMISSIONS["diet"][k] for k in DIET_KEYS])
+
+HEATING_KEYS = tuple(EMISSIONS["heating"])
+HEATING_FACTORS = np.array([EMISSIONS["heating"][k] for k in HEATING_KEYS])
+
 # Global CO2 targets and benchmarks
 TARGETS = {
     "paris_agreement_daily": 6.0,  # kg CO2/day per person to limit warming to 1.5°C
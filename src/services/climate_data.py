@@ -3,22 +3,53 @@ Real-time climate data extraction service
 Fetches data from various public APIs
 """
 
-import requests
+import io
+import orjson
+import re
+import requests_cache
+import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Optional
 import json
 
+# Title of the first <item> in an RSS feed, for feeds the XML parser rejects
+_ITEM_TITLE_RE = re.compile(r'<item\b.*?<title>(.*?)</title>', re.DOTALL)
+
+
 class ClimateDataService:
     """
     Extracts real-time climate and environmental data
     """
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, cache_name: str = "climate_cache"):
+        # HTTP cache honouring Cache-Control/ETag/Last-Modified: expired entries are
+        # revalidated with conditional requests, so unchanged feeds come back as a
+        # bodiless 304. The grid intensity updates every 30 minutes, the rest daily
+        # or weekly. Stale entries are served if the upstream request fails.
+        self.session = requests_cache.CachedSession(
+            cache_name,
+            expire_after=3600,
+            urls_expire_after={'api.carbonintensity.org.uk': 900},
+            cache_control=True,
+            allowable_codes=(200, 206),
+            stale_if_error=True
+        )
         self.session.headers.update({
             'User-Agent': 'ClimateFootprintApp/1.0'
         })
 
+        # Pool connections per host and retry transient server errors before
+        # falling back to estimated values
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+
     def get_carbon_intensity(self, country_code: str = "GB") -> Optional[Dict]:
         """
         Get real-time grid carbon intensity from Carbon Intensity API (UK)
@@ -29,7 +60,7 @@ class ClimateDataService:
             response = self.session.get(url, timeout=5)
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('data') and len(data['data']) > 0:
                     intensity = data['data'][0]['intensity']
                     return {
@@ -52,16 +83,16 @@ class ClimateDataService:
         try:
             # Using NOAA's public data endpoint
             url = "https://gml.noaa.gov/webdata/ccgg/trends/co2/co2_weekly_mlo.txt"
-            response = self.session.get(url, timeout=5)
-
-            if response.status_code == 200:
-                lines = response.text.strip().split('\n')
-                # Skip header lines (start with #)
-                data_lines = [l for l in lines if not l.startswith('#') and l.strip()]
-
-                if data_lines:
-                    # Get the most recent measurement (last line)
-                    recent = data_lines[-1].split()
+            # The most recent measurement is the last line, so only request the tail
+            # of the file. A server that ignores Range answers 200 with the full body.
+            response = self.session.get(url, headers={'Range': 'bytes=-4096'}, timeout=5)
+
+            if response.status_code in (200, 206):
+                # Walk back from the end; header lines start with #
+                for line in reversed(response.text.splitlines()):
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    recent = line.split()
                     if len(recent) >= 5:
                         return {
                             'ppm': float(recent[4]),
@@ -70,6 +101,7 @@ class ClimateDataService:
                             'day': int(recent[2]),
                             'source': 'NOAA Mauna Loa Observatory'
                         }
+                    break
         except Exception as e:
             print(f"Error fetching CO2 data: {e}")
 
@@ -89,13 +121,24 @@ class ClimateDataService:
             # NASA Climate RSS feed
             url = "https://climate.nasa.gov/news/rss.xml"
             response = self.session.get(url, timeout=5)
-
             if response.status_code == 200:
-                # Simple extraction of first headline
-                import re
-                titles = re.findall(r'<title>(.*?)</title>', response.text)
-                if len(titles) > 2:  # First is usually the feed title
-                    return f"Latest: {titles[1]}"
+                # Read the body once so the parser and the fallback below see
+                # the same bytes, whether or not the response came from cache
+                content = response.content
+                # Parse the feed incrementally and stop at the first item,
+                # so the rest of the document is never parsed
+                try:
+                    for _, element in ET.iterparse(io.BytesIO(content), events=('end',)):
+                        if element.tag == 'item':
+                            title = element.findtext('title')
+                            if title:
+                                return f"Latest: {title.strip()}"
+                            break
+                except ET.ParseError:
+                    # Malformed feed: fall back to the first item title in the raw text
+                    match = _ITEM_TITLE_RE.search(response.text)
+                    if match:
+                        return f"Latest: {match.group(1).strip()}"
         except Exception as e:
             print(f"Error fetching climate news: {e}")
 
@@ -121,9 +164,15 @@ class ClimateDataService:
         """
         Get comprehensive climate context for the user
         """
-        co2_data = self.get_atmospheric_co2()
-        carbon_intensity = self.get_carbon_intensity()
-        news = self.get_climate_news_summary()
+        # The three sources are independent, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            co2_future = executor.submit(self.get_atmospheric_co2)
+            intensity_future = executor.submit(self.get_carbon_intensity)
+            news_future = executor.submit(self.get_climate_news_summary)
+
+        co2_data = co2_future.result()
+        carbon_intensity = intensity_future.result()
+        news = news_future.result()
 
         context = {
             'atmospheric_co2_ppm': co2_data.get('ppm') if co2_data else 425.0,
@@ -4,11 +4,194 @@ SQLite database for tracking carbon footprint history
 
 import sqlite3
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import threading
+import time
+import numpy as np
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
 from pathlib import Path
 
 
+# Hot statements are built once at import; the connection's statement cache is
+# keyed on the SQL text, so every call reuses the same prepared statement
+
+# Columns bound by _SQL_INSERT_FOOTPRINT, in the order of the tuples built by
+# CarbonFootprintDB._footprint_values
+_FOOTPRINT_COLUMNS = (
+    'timestamp', 'total_emissions', 'transport_emissions', 'diet_emissions',
+    'heating_emissions', 'electricity_emissions', 'consumption_emissions',
+    'transport_mode', 'distance_km', 'diet_type', 'heating_type',
+    'heating_hours', 'electricity_kwh', 'grid_carbon_intensity',
+    'atmospheric_co2_ppm', 'notes'
+)
+
+# footprint_records has no rowid to auto-assign ids from, so writers open a
+# BEGIN IMMEDIATE transaction, read the next id under that write lock and bind
+# it explicitly; idx_footprint_id makes MAX(id) a single index probe. Unlike
+# AUTOINCREMENT, MAX(id) + 1 hands out ids again after clear_all_data empties
+# the table
+_SQL_NEXT_FOOTPRINT_ID = 'SELECT COALESCE(MAX(id), 0) + 1 FROM footprint_records'
+
+_SQL_INSERT_FOOTPRINT = f'''
+    INSERT INTO footprint_records (id, {', '.join(_FOOTPRINT_COLUMNS)})
+    VALUES (?, {', '.join('?' * len(_FOOTPRINT_COLUMNS))})
+'''
+
+# Category sums skip NULLs and each category keeps its own count of non-NULL
+# values, so the averages match AVG over the records
+_SQL_UPSERT_ROLLUP = '''
+    INSERT INTO daily_rollup (
+        date, total, n, min_total, max_total,
+        transport, diet, heating, electricity, consumption,
+        transport_n, diet_n, heating_n, electricity_n, consumption_n
+    ) VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date) DO UPDATE SET
+        total = total + excluded.total,
+        n = n + 1,
+        min_total = MIN(min_total, excluded.min_total),
+        max_total = MAX(max_total, excluded.max_total),
+        transport = transport + excluded.transport,
+        diet = diet + excluded.diet,
+        heating = heating + excluded.heating,
+        electricity = electricity + excluded.electricity,
+        consumption = consumption + excluded.consumption,
+        transport_n = transport_n + excluded.transport_n,
+        diet_n = diet_n + excluded.diet_n,
+        heating_n = heating_n + excluded.heating_n,
+        electricity_n = electricity_n + excluded.electricity_n,
+        consumption_n = consumption_n + excluded.consumption_n
+'''
+
+# Recompute every day of the rollup from footprint_records
+_SQL_REBUILD_ROLLUP = '''
+    INSERT INTO daily_rollup (
+        date, total, n, min_total, max_total,
+        transport, diet, heating, electricity, consumption,
+        transport_n, diet_n, heating_n, electricity_n, consumption_n
+    )
+    SELECT
+        date(timestamp, 'unixepoch', 'localtime'),
+        SUM(total_emissions),
+        COUNT(*),
+        MIN(total_emissions),
+        MAX(total_emissions),
+        TOTAL(transport_emissions),
+        TOTAL(diet_emissions),
+        TOTAL(heating_emissions),
+        TOTAL(electricity_emissions),
+        TOTAL(consumption_emissions),
+        COUNT(transport_emissions),
+        COUNT(diet_emissions),
+        COUNT(heating_emissions),
+        COUNT(electricity_emissions),
+        COUNT(consumption_emissions)
+    FROM footprint_records
+    GROUP BY 1
+'''
+
+# True when the rollup no longer accounts for exactly the stored records
+_SQL_ROLLUP_OUT_OF_SYNC = '''
+    SELECT
+        (SELECT COALESCE(SUM(n), 0) FROM daily_rollup)
+        != (SELECT COUNT(*) FROM footprint_records)
+'''
+
+# Statistics and category averages over daily_rollup in one aggregate; shared
+# by get_statistics, get_category_breakdown and get_dashboard_bundle
+_SQL_WINDOW_TOTALS = '''
+    SELECT
+        COALESCE(SUM(n), 0) as record_count,
+        SUM(total) / SUM(n) as avg_emissions,
+        MIN(min_total) as min_emissions,
+        MAX(max_total) as max_emissions,
+        SUM(total) as total_emissions,
+        SUM(transport) / NULLIF(SUM(transport_n), 0) as avg_transport,
+        SUM(diet) / NULLIF(SUM(diet_n), 0) as avg_diet,
+        SUM(heating) / NULLIF(SUM(heating_n), 0) as avg_heating,
+        SUM(electricity) / NULLIF(SUM(electricity_n), 0) as avg_electricity,
+        SUM(consumption) / NULLIF(SUM(consumption_n), 0) as avg_consumption
+    FROM daily_rollup
+    WHERE date >= ?
+'''
+
+_SQL_TREND = '''
+    SELECT
+        timestamp,
+        total_emissions,
+        transport_emissions,
+        diet_emissions,
+        heating_emissions,
+        electricity_emissions,
+        consumption_emissions
+    FROM footprint_records
+    WHERE timestamp >= ?
+    ORDER BY timestamp ASC
+'''
+
+# Row count of _SQL_TREND, to size get_trend_data's buffer before fetching
+_SQL_COUNT_TREND = 'SELECT COUNT(*) FROM footprint_records WHERE timestamp >= ?'
+
+# The window totals joined onto every trend row, for get_dashboard_bundle
+_SQL_DASHBOARD = f'''
+    WITH totals AS ({_SQL_WINDOW_TOTALS})
+    SELECT
+        totals.*,
+        r.timestamp,
+        r.total_emissions,
+        r.transport_emissions,
+        r.diet_emissions,
+        r.heating_emissions,
+        r.electricity_emissions,
+        r.consumption_emissions
+    FROM totals
+    LEFT JOIN footprint_records r ON r.timestamp >= ?
+    ORDER BY r.timestamp ASC
+'''
+
+_SQL_RECENT_RECORDS = '''
+    SELECT * FROM footprint_records
+    ORDER BY timestamp DESC
+    LIMIT ?
+'''
+
+_SQL_INSERT_INSIGHT = '''
+    INSERT INTO llm_insights (timestamp, footprint_id, insight_text, model_used)
+    VALUES (?, ?, ?, ?)
+'''
+
+_SQL_PRUNE_LLM_CACHE = 'DELETE FROM llm_cache WHERE created_at < ?'
+
+_SQL_GET_LLM_RESPONSE = '''
+    SELECT created_at, response FROM llm_cache
+    WHERE prompt_hash = ? AND created_at >= ?
+'''
+
+_SQL_SAVE_LLM_RESPONSE = '''
+    INSERT OR REPLACE INTO llm_cache (prompt_hash, model, response, created_at)
+    VALUES (?, ?, ?, ?)
+'''
+
+
+def _to_epoch(value) -> int:
+    """Convert a datetime, ISO-8601 string or epoch number to epoch seconds"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _cutoff(days: int) -> int:
+    """Epoch seconds for local midnight N days ago"""
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    return int(start.timestamp())
+
+
+def _cutoff_date(days: int) -> str:
+    """Local date N days ago, as stored in daily_rollup"""
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
 class CarbonFootprintDB:
     """
     Manages historical carbon footprint data
@@ -16,18 +199,124 @@ class CarbonFootprintDB:
 
     def __init__(self, db_path: str = "carbon_footprint.db"):
         self.db_path = db_path
+        # One connection for the lifetime of the service, shared by Streamlit's
+        # script threads; the lock keeps their statements from interleaving and
+        # "with self._conn" commits each write, or rolls it back on error
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.RLock()
         self.init_database()
 
     def init_database(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Main footprint records
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS footprint_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
+        with self._lock, self._conn:
+            # WAL lets readers proceed while a write is in progress, and with it
+            # synchronous=NORMAL only fsyncs at checkpoints
+            self._conn.executescript('''
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-64000;
+                PRAGMA mmap_size=268435456;
+            ''')
+
+            cursor = self._conn.cursor()
+
+            # Main footprint records
+            self._create_footprint_table(cursor, 'footprint_records')
+            self._migrate_footprint_table(cursor)
+
+            # User goals and achievements
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_goals (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    goal_type TEXT NOT NULL,
+                    target_value REAL NOT NULL,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT,
+                    achieved BOOLEAN DEFAULT 0,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+
+            # Insights from LLM
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_insights (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    footprint_id INTEGER,
+                    insight_text TEXT NOT NULL,
+                    model_used TEXT,
+                    FOREIGN KEY (footprint_id) REFERENCES footprint_records (id)
+                )
+            ''')
+
+            # Per-day sums maintained by save_footprint, so window statistics
+            # scan at most one row per day instead of every record. The rollup
+            # is derived data: a table from before the per-category counts is
+            # dropped and rebuilt, as is one that has drifted from the records
+            cursor.execute('PRAGMA table_info(daily_rollup)')
+            rollup_columns = {row[1] for row in cursor.fetchall()}
+            if rollup_columns and 'transport_n' not in rollup_columns:
+                cursor.execute('DROP TABLE daily_rollup')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_rollup (
+                    date TEXT PRIMARY KEY,
+                    total REAL NOT NULL,
+                    n INTEGER NOT NULL,
+                    min_total REAL NOT NULL,
+                    max_total REAL NOT NULL,
+                    transport REAL NOT NULL,
+                    diet REAL NOT NULL,
+                    heating REAL NOT NULL,
+                    electricity REAL NOT NULL,
+                    consumption REAL NOT NULL,
+                    transport_n INTEGER NOT NULL,
+                    diet_n INTEGER NOT NULL,
+                    heating_n INTEGER NOT NULL,
+                    electricity_n INTEGER NOT NULL,
+                    consumption_n INTEGER NOT NULL
+                )
+            ''')
+
+            cursor.execute(_SQL_ROLLUP_OUT_OF_SYNC)
+            if cursor.fetchone()[0]:
+                self._rebuild_rollup(cursor)
+
+            # Completed LLM responses keyed by a hash of model and prompt
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    prompt_hash TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT NOT NULL,
+                    created_at INTEGER NOT NULL
+                )
+            ''')
+
+            # footprint_records is stored in timestamp order, so range scans and
+            # ORDER BY timestamp read the table itself; earlier timestamp
+            # indexes would only duplicate it
+            cursor.execute('DROP INDEX IF EXISTS idx_footprint_timestamp')
+            cursor.execute('DROP INDEX IF EXISTS idx_trend_cover')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_footprint_id
+                ON footprint_records (id)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_insights_footprint
+                ON llm_insights (footprint_id)
+            ''')
+
+    @staticmethod
+    def _create_footprint_table(cursor: sqlite3.Cursor, name: str):
+        """
+        Create a footprint records table; timestamps are epoch seconds
+        The table is keyed and stored by (timestamp, id) without a separate
+        rowid B-tree, so time-window reads are sequential page scans
+        """
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {name} (
+                timestamp INTEGER NOT NULL,
+                id INTEGER NOT NULL,
                 total_emissions REAL NOT NULL,
                 transport_emissions REAL,
                 diet_emissions REAL,
@@ -42,53 +331,52 @@ class CarbonFootprintDB:
                 electricity_kwh REAL,
                 grid_carbon_intensity REAL,
                 atmospheric_co2_ppm REAL,
-                notes TEXT
-            )
-        ''')
-
-        # User goals and achievements
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                goal_type TEXT NOT NULL,
-                target_value REAL NOT NULL,
-                start_date TEXT NOT NULL,
-                end_date TEXT,
-                achieved BOOLEAN DEFAULT 0,
-                created_at TEXT NOT NULL
-            )
-        ''')
-
-        # Insights from LLM
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS llm_insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                footprint_id INTEGER,
-                insight_text TEXT NOT NULL,
-                model_used TEXT,
-                FOREIGN KEY (footprint_id) REFERENCES footprint_records (id)
-            )
+                notes TEXT,
+                PRIMARY KEY (timestamp, id)
+            ) WITHOUT ROWID
         ''')
 
-        conn.commit()
-        conn.close()
-
-    def save_footprint(self, data: Dict) -> int:
-        """Save a footprint calculation"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO footprint_records (
-                timestamp, total_emissions, transport_emissions, diet_emissions,
-                heating_emissions, electricity_emissions, consumption_emissions,
-                transport_mode, distance_km, diet_type, heating_type,
-                heating_hours, electricity_kwh, grid_carbon_intensity,
-                atmospheric_co2_ppm, notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('timestamp', datetime.now().isoformat()),
+    def _migrate_footprint_table(self, cursor: sqlite3.Cursor):
+        """
+        Rebuild a footprint_records table from an older schema: rowid-keyed,
+        possibly with ISO-8601 TEXT timestamps
+        Neither can be altered in place, so the rows are copied into a fresh
+        table, converting timestamps to epoch seconds on the way
+        """
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'footprint_records'"
+        )
+        if 'WITHOUT ROWID' in cursor.fetchone()[0].upper():
+            return
+
+        cursor.execute('SELECT * FROM footprint_records')
+        columns = [description[0] for description in cursor.description]
+        ts_index = columns.index('timestamp')
+        rows = []
+        for row in cursor.fetchall():
+            row = list(row)
+            row[ts_index] = _to_epoch(row[ts_index])
+            rows.append(row)
+
+        self._create_footprint_table(cursor, 'footprint_records_new')
+        cursor.executemany(
+            f"INSERT INTO footprint_records_new ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            rows
+        )
+        cursor.execute('DROP TABLE footprint_records')
+        cursor.execute('ALTER TABLE footprint_records_new RENAME TO footprint_records')
+
+    @staticmethod
+    def _footprint_values(data: Dict) -> tuple:
+        """
+        Build the footprint_records parameter tuple for one calculation, in
+        _FOOTPRINT_COLUMNS order
+        """
+        # Spelled out rather than looped over _FOOTPRINT_COLUMNS: inline
+        # dict.get calls are the fastest way to build this tuple
+        return (
+            _to_epoch(data.get('timestamp', datetime.now())),
             data['total_emissions'],
             data.get('transport_emissions', 0),
             data.get('diet_emissions', 0),
@@ -104,69 +392,138 @@ class CarbonFootprintDB:
             data.get('grid_carbon_intensity'),
             data.get('atmospheric_co2_ppm'),
             data.get('notes')
-        ))
+        )
+
+    @staticmethod
+    def _add_to_rollup(cursor: sqlite3.Cursor, rows: List[tuple]):
+        """Fold the total and category emissions of saved rows into their days' rollup"""
+        params = []
+        for row in rows:
+            total = row[1]
+            categories = row[2:7]
+            params.append((
+                datetime.fromtimestamp(row[0]).date().isoformat(),
+                total, total, total,
+                *(value or 0 for value in categories),
+                *(int(value is not None) for value in categories)
+            ))
+
+        cursor.executemany(_SQL_UPSERT_ROLLUP, params)
+
+    @staticmethod
+    def _rebuild_rollup(cursor: sqlite3.Cursor):
+        """Replace the whole rollup with sums recomputed from footprint_records"""
+        cursor.execute('DELETE FROM daily_rollup')
+        cursor.execute(_SQL_REBUILD_ROLLUP)
+
+    def rebuild_rollup(self):
+        """Recompute the daily rollup from the stored records"""
+        with self._lock, self._conn:
+            self._rebuild_rollup(self._conn.cursor())
+
+    def save_footprint(self, data: Dict) -> int:
+        """Save a footprint calculation"""
+        values = self._footprint_values(data)
+
+        with self._lock, self._conn:
+            # The implicit BEGIN would only come with the INSERT, leaving the
+            # id read outside the write transaction, where another connection
+            # could take the same id first
+            self._conn.execute('BEGIN IMMEDIATE')
+            cursor = self._conn.cursor()
 
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            cursor.execute(_SQL_NEXT_FOOTPRINT_ID)
+            record_id = cursor.fetchone()[0]
+
+            cursor.execute(_SQL_INSERT_FOOTPRINT, (record_id, *values))
+            self._add_to_rollup(cursor, [values])
 
         return record_id
 
+    def save_footprints_bulk(self, records: List[Dict]) -> int:
+        """
+        Save many footprint calculations in one transaction
+        Returns the number of records saved
+        """
+        rows = [self._footprint_values(data) for data in records]
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            # Take the write lock up front so the batch never has to upgrade
+            # from a read transaction midway
+            self._conn.execute('BEGIN IMMEDIATE')
+            cursor = self._conn.cursor()
+
+            cursor.execute(_SQL_NEXT_FOOTPRINT_ID)
+            next_id = cursor.fetchone()[0]
+
+            cursor.executemany(
+                _SQL_INSERT_FOOTPRINT,
+                ((next_id + i, *row) for i, row in enumerate(rows))
+            )
+            self._add_to_rollup(cursor, rows)
+
+        return len(rows)
+
     def save_llm_insight(self, footprint_id: int, insight: str, model: str = "llama3:8b"):
         """Save an LLM-generated insight"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock, self._conn:
+            cursor = self._conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO llm_insights (timestamp, footprint_id, insight_text, model_used)
-            VALUES (?, ?, ?, ?)
-        ''', (datetime.now().isoformat(), footprint_id, insight, model))
+            cursor.execute(
+                _SQL_INSERT_INSIGHT,
+                (datetime.now().isoformat(), footprint_id, insight, model)
+            )
 
-        conn.commit()
-        conn.close()
+    def get_llm_response(self, prompt_hash: str, max_age: int) -> Optional[tuple]:
+        """
+        Get a cached LLM response no older than max_age seconds
+        Returns (created_at, response) or None
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+
+            cursor.execute(_SQL_GET_LLM_RESPONSE, (prompt_hash, int(time.time()) - max_age))
+
+            return cursor.fetchone()
+
+    def save_llm_response(self, prompt_hash: str, model: str, response: str,
+                          max_age: Optional[int] = None):
+        """
+        Cache an LLM response, replacing any older one for the same prompt
+        When max_age is given, responses older than it are pruned as well
+        """
+        now = int(time.time())
+        with self._lock, self._conn:
+            cursor = self._conn.cursor()
+
+            if max_age is not None:
+                cursor.execute(_SQL_PRUNE_LLM_CACHE, (now - max_age,))
+
+            cursor.execute(
+                _SQL_SAVE_LLM_RESPONSE,
+                (prompt_hash, model, response, now)
+            )
 
-    def get_recent_records(self, limit: int = 30) -> List[Dict]:
-        """Get recent footprint records"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def get_recent_records(self, limit: int = 30) -> List[sqlite3.Row]:
+        """
+        Get recent footprint records
+        Rows support access by column name; timestamps are epoch seconds
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.row_factory = sqlite3.Row
 
-        cursor.execute('''
-            SELECT * FROM footprint_records
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
+            cursor.execute(_SQL_RECENT_RECORDS, (limit,))
 
-        records = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+            records = cursor.fetchall()
 
         return records
 
-    def get_statistics(self, days: int = 30) -> Dict:
-        """Get statistics for the past N days"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-
-        cursor.execute('''
-            SELECT
-                COUNT(*) as record_count,
-                AVG(total_emissions) as avg_emissions,
-                MIN(total_emissions) as min_emissions,
-                MAX(total_emissions) as max_emissions,
-                SUM(total_emissions) as total_emissions,
-                AVG(transport_emissions) as avg_transport,
-                AVG(diet_emissions) as avg_diet,
-                AVG(heating_emissions) as avg_heating,
-                AVG(electricity_emissions) as avg_electricity
-            FROM footprint_records
-            WHERE timestamp >= ?
-        ''', (cutoff_date,))
-
-        row = cursor.fetchone()
-        conn.close()
-
+    @staticmethod
+    def _statistics_from_totals(row: tuple, days: int) -> Dict:
+        """Shape a _SQL_WINDOW_TOTALS row into the statistics dict"""
         if row and row[0] > 0:
             return {
                 'record_count': row[0],
@@ -186,76 +543,116 @@ class CarbonFootprintDB:
                 'period_days': days
             }
 
-    def get_trend_data(self, days: int = 30) -> List[Dict]:
-        """Get time-series data for charts"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-
-        cursor.execute('''
-            SELECT
-                timestamp,
-                total_emissions,
-                transport_emissions,
-                diet_emissions,
-                heating_emissions,
-                electricity_emissions,
-                consumption_emissions
-            FROM footprint_records
-            WHERE timestamp >= ?
-            ORDER BY timestamp ASC
-        ''', (cutoff_date,))
-
-        records = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+    @staticmethod
+    def _breakdown_from_totals(row: tuple) -> Dict:
+        """Shape a _SQL_WINDOW_TOTALS row into the category breakdown dict"""
+        return {
+            'Transport': row[5] or 0,
+            'Diet': row[6] or 0,
+            'Heating': row[7] or 0,
+            'Electricity': row[8] or 0,
+            'Consumption': row[9] or 0
+        }
+
+    def _get_window_totals(self, days: int) -> tuple:
+        """Run the shared statistics and category aggregate for the past N days"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute(_SQL_WINDOW_TOTALS, (_cutoff_date(days),))
+            return cursor.fetchone()
 
-        return records
+    def get_statistics(self, days: int = 30) -> Dict:
+        """Get statistics for the past N days"""
+        return self._statistics_from_totals(self._get_window_totals(days), days)
+
+    @staticmethod
+    def _fill_trend(cursor: sqlite3.Cursor, rows: List[tuple], size: int,
+                    batch: int, start: int = 0) -> np.ndarray:
+        """
+        Copy the trend columns, from column start on, of rows and of every row
+        left on cursor into a float buffer sized for size records, batch at a
+        time, so at most one batch of Python row tuples exists at once
+        """
+        buffer = np.empty((size, 7))
+        filled = 0
+        while rows:
+            end = filled + len(rows)
+            if end > len(buffer):
+                # Another connection saved records after size was read
+                buffer = np.concatenate((buffer, np.empty((end - len(buffer), 7))))
+            buffer[filled:end] = np.array(rows, dtype=float)[:, start:]
+            filled = end
+            rows = cursor.fetchmany(batch)
+
+        return buffer[:filled]
+
+    def get_trend_data(self, days: int = 30, batch: int = 500) -> np.ndarray:
+        """
+        Get time-series data for charts as a float array, one row per record
+        Columns are timestamp (epoch seconds), total_emissions and the five
+        category emissions, in timestamp order; missing values are NaN
+        """
+        cutoff = _cutoff(days)
+
+        # The statement runs to completion under the lock and the cursor is
+        # closed before returning, so no read stays open to hold back WAL
+        # checkpoints
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(_SQL_COUNT_TREND, (cutoff,))
+                size = cursor.fetchone()[0]
+
+                cursor.execute(_SQL_TREND, (cutoff,))
+                return self._fill_trend(cursor, cursor.fetchmany(batch), size, batch)
+            finally:
+                cursor.close()
 
     def get_category_breakdown(self, days: int = 30) -> Dict:
         """Get average breakdown by category"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-
-        cursor.execute('''
-            SELECT
-                AVG(transport_emissions) as transport,
-                AVG(diet_emissions) as diet,
-                AVG(heating_emissions) as heating,
-                AVG(electricity_emissions) as electricity,
-                AVG(consumption_emissions) as consumption
-            FROM footprint_records
-            WHERE timestamp >= ?
-        ''', (cutoff_date,))
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return {
-                'Transport': row[0] or 0,
-                'Diet': row[1] or 0,
-                'Heating': row[2] or 0,
-                'Electricity': row[3] or 0,
-                'Consumption': row[4] or 0
-            }
-        else:
-            return {}
+        return self._breakdown_from_totals(self._get_window_totals(days))
+
+    def get_dashboard_bundle(self, days: int = 30, batch: int = 500) -> Dict:
+        """
+        Get statistics, category breakdown and trend data for the past N days
+        One SELECT: the rollup aggregates are joined onto every trend row
+        The trend is a float array shaped like get_trend_data's
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute(_SQL_DASHBOARD, (_cutoff_date(days), _cutoff(days)))
+
+                # The first ten columns are the totals, the rest a trend row;
+                # with no records in the window the LEFT JOIN leaves a single
+                # row of NULLs. The record count sizes the trend buffer
+                row = cursor.fetchone()
+                first = [row] if row[10] is not None else []
+                trend = self._fill_trend(cursor, first, row[0], batch, start=10)
+            finally:
+                cursor.close()
+
+        return {
+            'statistics': self._statistics_from_totals(row, days),
+            'category_breakdown': self._breakdown_from_totals(row) if row[0] > 0 else {},
+            'trend': trend
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
 
     def clear_all_data(self):
         """Clear all records (use with caution)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('DELETE FROM footprint_records')
-        cursor.execute('DELETE FROM llm_insights')
-        cursor.execute('DELETE FROM user_goals')
+        with self._lock, self._conn:
+            cursor = self._conn.cursor()
 
-        conn.commit()
-        conn.close()
+            cursor.execute('DELETE FROM footprint_records')
+            cursor.execute('DELETE FROM daily_rollup')
+            cursor.execute('DELETE FROM llm_insights')
+            cursor.execute('DELETE FROM llm_cache')
+            cursor.execute('DELETE FROM user_goals')
 
 
 if __name__ == "__main__":
@@ -264,7 +661,7 @@ if __name__ == "__main__":
 
     # Test saving a record
     test_data = {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': int(datetime.now().timestamp()),
         'total_emissions': 15.5,
         'transport_emissions': 5.0,
         'diet_emissions': 5.0,
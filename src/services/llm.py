@@ -2,43 +2,323 @@
 Enhanced LLM service with context-aware prompts for Ollama
 """
 
-import subprocess
-import json
-from typing import Dict, Optional
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import httpx
+import orjson
+import requests
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 
+# 4-bit quantized Llama3 8B: roughly a quarter of the weight traffic per token of FP16
+DEFAULT_MODEL = os.environ.get("OLLAMA_MODEL", "llama3:8b-instruct-q4_K_M")
+
+# Server to talk to and its API flavour: "ollama" for /api/generate, or "openai"
+# for the /v1/chat/completions endpoint exposed by llama.cpp's llama-server
+DEFAULT_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+DEFAULT_API = os.environ.get("LLM_API", "ollama")
+
+
+@lru_cache(maxsize=64)
+def _quick_tips_prompt(total_rounded: float, biggest_category: str, user_guidance: Optional[str]) -> str:
+    """Quick tips prompt text, memoized on its (already rounded) inputs"""
+    prompt = f"Give 3 quick, actionable tips to reduce a {total_rounded:.1f} kg CO₂/day footprint. The biggest contributor is {biggest_category}. Be specific and brief."
+    if user_guidance:
+        prompt += f"\n\nUser's specific context/goals: {user_guidance}"
+    return prompt
+
+
+@lru_cache(maxsize=8)
+def _context_header(
+    today: str,
+    co2_ppm: float,
+    co2_source: str,
+    daily_budget: float,
+    headline: str,
+    grid_intensity: Optional[Tuple]
+) -> str:
+    """
+    Opening of the analysis prompt with the current climate context, memoized
+    on the context fields; grid_intensity is (actual, index, source) or None
+    """
+    header = f"""You are an expert climate scientist and sustainability advisor. Analyze this person's carbon footprint with deep insight and actionable recommendations.
+
+## CURRENT CONTEXT
+- Date: {today}
+- Atmospheric CO₂: {co2_ppm:.1f} ppm (Source: {co2_source})
+- Paris Agreement Target: Stay below 1.5°C warming → requires {daily_budget} kg CO₂/day per person
+- Latest Climate News: {headline}
+"""
+    if grid_intensity:
+        actual, index, source = grid_intensity
+        header += f"- Current Grid Carbon Intensity: {actual} gCO₂/kWh ({index} - {source})\n"
+    return header
+
 
 class OllamaService:
     """
     Service for interacting with Ollama LLM with rich context
     """
 
-    def __init__(self, model: str = "llama3:8b"):
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        base_url: str = DEFAULT_BASE_URL,
+        api: str = DEFAULT_API,
+        keep_alive: str = "30m",
+        num_batch: int = 256,
+        cache_size: int = 128,
+        cache_ttl: int = 3600,
+        store=None
+    ):
         self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.api = api
+        # How long Ollama keeps the model loaded after a request
+        self.keep_alive = keep_alive
+        # Prompt tokens processed per batch; lower values trade throughput for VRAM
+        self.num_batch = num_batch
+        # Persistent session so repeated prompts reuse the keep-alive connection
+        self.session = requests.Session()
+
+        # Completed responses keyed by prompt hash, oldest first
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Optional persistent cache behind the in-memory one, such as
+        # CarbonFootprintDB; it outlives app restarts
+        self.store = store
+
+    def _cache_key(self, prompt: str) -> str:
+        """Hash the model and prompt into a cache key"""
+        return hashlib.blake2b(f"{self.model}\0{prompt}".encode(), digest_size=16).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[str]:
+        """Return a cached response if it has not expired"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if time.time() - created_at <= self.cache_ttl:
+                    self._cache.move_to_end(key)
+                    return response
+                del self._cache[key]
+
+        if self.store is None:
+            return None
+
+        stored = self.store.get_llm_response(key, self.cache_ttl)
+        if stored is None:
+            return None
+        created_at, response = stored
+        self._remember(key, created_at, response)
+        return response
+
+    def _remember(self, key: str, created_at: float, response: str):
+        """Put a response in the in-memory cache, evicting the least recently used one"""
+        with self._cache_lock:
+            self._cache[key] = (created_at, response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _store_cached(self, key: str, response: str):
+        """Cache a successful response in memory and in the persistent store"""
+        self._remember(key, time.time(), response)
+        if self.store is not None:
+            self.store.save_llm_response(key, self.model, response, self.cache_ttl)
+
+    def _endpoint(self) -> str:
+        """URL of the generation endpoint for the configured API"""
+        if self.api == "openai":
+            return f"{self.base_url}/v1/chat/completions"
+        return f"{self.base_url}/api/generate"
+
+    def _build_payload(self, prompt: str, stream: bool) -> Dict:
+        """Build the request body for the generation endpoint"""
+        if self.api == "openai":
+            return {
+                'model': self.model,
+                'messages': [{'role': 'user', 'content': prompt}],
+                'stream': stream
+            }
+        return {
+            'model': self.model,
+            'prompt': prompt,
+            'stream': stream,
+            'keep_alive': self.keep_alive,
+            'options': {'num_batch': self.num_batch}
+        }
+
+    def _extract_text(self, data: Dict) -> str:
+        """Pull the generated text out of a non-streaming response body"""
+        if self.api == "openai":
+            return data['choices'][0]['message']['content'].strip()
+        return data['response'].strip()
+
+    def _parse_stream_line(self, line: bytes) -> Tuple[str, bool, Optional[str]]:
+        """
+        Parse one line of a streaming response into (text, done, error)
+        Ollama sends one JSON object per line; the OpenAI API sends server-sent events
+        """
+        if self.api == "openai":
+            if not line.startswith(b'data:'):
+                return '', False, None
+            data = line[len(b'data:'):].strip()
+            if data == b'[DONE]':
+                return '', True, None
+            chunk = orjson.loads(data)
+            if chunk.get('error'):
+                return '', True, str(chunk['error'])
+            delta = chunk['choices'][0].get('delta', {})
+            return delta.get('content') or '', False, None
+
+        chunk = orjson.loads(line)
+        if chunk.get('error'):
+            return '', True, chunk['error']
+        return chunk.get('response', ''), bool(chunk.get('done')), None
+
+    def preload(self, timeout: int = 180) -> bool:
+        """
+        Load the model into memory ahead of the first prompt
+        Ollama treats a request without a prompt as a load-only request that
+        also applies keep_alive; llama-server loads its model at startup
+        """
+        if self.api != "ollama":
+            return True
+
+        try:
+            response = self.session.post(
+                self._endpoint(),
+                json={'model': self.model, 'keep_alive': self.keep_alive},
+                timeout=timeout
+            )
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
 
     def generate_response(self, prompt: str, max_retries: int = 2, timeout: int = 180) -> str:
         """
-        Generate a response from Ollama
+        Generate a response from the LLM server
+        """
+        key = self._cache_key(prompt)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            response = self.session.post(
+                self._endpoint(),
+                json=self._build_payload(prompt, stream=False),
+                timeout=timeout
+            )
+
+            if response.status_code == 200:
+                text = self._extract_text(orjson.loads(response.content))
+                self._store_cached(key, text)
+                return text
+            else:
+                return f"Error: {response.text}"
+
+        except requests.Timeout:
+            return "Error: Request timed out. Please try again."
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+
+    def stream_response(self, prompt: str, timeout: int = 180) -> Iterator[str]:
+        """
+        Stream a response from the LLM server, yielding text as it is generated
+        """
+        key = self._cache_key(prompt)
+        cached = self._get_cached(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        try:
+            with self.session.post(
+                self._endpoint(),
+                json=self._build_payload(prompt, stream=True),
+                stream=True,
+                timeout=timeout
+            ) as response:
+                if response.status_code != 200:
+                    yield f"Error: {response.text}"
+                    return
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    text, done, error = self._parse_stream_line(line)
+                    if error:
+                        yield f"Error: {error}"
+                        return
+                    if text:
+                        parts.append(text)
+                        yield text
+                    if done:
+                        self._store_cached(key, "".join(parts).strip())
+                        return
+
+        except requests.Timeout:
+            yield "Error: Request timed out. Please try again."
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+
+    async def agenerate_response(
+        self,
+        client: httpx.AsyncClient,
+        prompt: str,
+        timeout: int = 180
+    ) -> str:
+        """
+        Async counterpart of generate_response using a shared httpx client
         """
+        key = self._cache_key(prompt)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+
         try:
-            result = subprocess.run(
-                ["ollama", "run", self.model],
-                input=prompt,
-                text=True,
-                capture_output=True,
+            response = await client.post(
+                self._endpoint(),
+                json=self._build_payload(prompt, stream=False),
                 timeout=timeout
             )
 
-            if result.returncode == 0:
-                return result.stdout.strip()
+            if response.status_code == 200:
+                text = self._extract_text(orjson.loads(response.content))
+                self._store_cached(key, text)
+                return text
             else:
-                return f"Error: {result.stderr}"
+                return f"Error: {response.text}"
 
-        except subprocess.TimeoutExpired:
+        except httpx.TimeoutException:
             return "Error: Request timed out. Please try again."
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
+    def generate_many(self, prompts: List[str], timeout: int = 180) -> List[str]:
+        """
+        Generate responses for independent prompts concurrently
+        Ollama serves them in parallel up to OLLAMA_NUM_PARALLEL
+        """
+        async def gather_responses() -> List[str]:
+            # One client per event loop; asyncio.run creates a fresh loop each call
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                return await asyncio.gather(
+                    *(self.agenerate_response(client, prompt, timeout) for prompt in prompts)
+                )
+
+        return asyncio.run(gather_responses())
+
     def create_personalized_analysis_prompt(
         self,
         user_data: Dict,
@@ -53,26 +333,27 @@ class OllamaService:
         total = user_data['total_emissions']
         breakdown = user_data.get('breakdown', {})
 
-        prompt = f"""You are an expert climate scientist and sustainability advisor. Analyze this person's carbon footprint with deep insight and actionable recommendations.
-
-## CURRENT CONTEXT
-- Date: {datetime.now().strftime('%B %d, %Y')}
-- Atmospheric CO₂: {climate_context.get('atmospheric_co2_ppm', 425):.1f} ppm (Source: {climate_context.get('co2_source', 'NOAA')})
-- Paris Agreement Target: Stay below 1.5°C warming → requires {climate_context.get('daily_co2_budget_kg', 6.0)} kg CO₂/day per person
-- Latest Climate News: {climate_context.get('climate_headline', 'Climate action remains urgent')}
-"""
-
-        if climate_context.get('grid_intensity'):
-            intensity = climate_context['grid_intensity']
-            prompt += f"- Current Grid Carbon Intensity: {intensity.get('actual', 'N/A')} gCO₂/kWh ({intensity.get('index', 'moderate')} - {intensity.get('source', 'UK')})\n"
+        intensity = climate_context.get('grid_intensity')
+        parts = [_context_header(
+            datetime.now().strftime('%B %d, %Y'),
+            climate_context.get('atmospheric_co2_ppm', 425),
+            climate_context.get('co2_source', 'NOAA'),
+            climate_context.get('daily_co2_budget_kg', 6.0),
+            climate_context.get('climate_headline', 'Climate action remains urgent'),
+            (
+                intensity.get('actual', 'N/A'),
+                intensity.get('index', 'moderate'),
+                intensity.get('source', 'UK')
+            ) if intensity else None
+        )]
 
         if location:
-            prompt += f"- User Location: {location}\n"
+            parts.append(f"- User Location: {location}\n")
 
         if user_guidance:
-            prompt += f"\n## USER'S SPECIFIC GUIDANCE\n{user_guidance}\n"
+            parts.append(f"\n## USER'S SPECIFIC GUIDANCE\n{user_guidance}\n")
 
-        prompt += f"""
+        parts.append(f"""
 ## USER'S DAILY FOOTPRINT
 - **Total Daily Emissions: {total:.2f} kg CO₂**
 - Transport: {breakdown.get('Transport', 0):.2f} kg CO₂ ({user_data.get('transport_mode', 'unknown')}, {user_data.get('distance_km', 0)} km)
@@ -80,19 +361,19 @@ class OllamaService:
 - Heating: {breakdown.get('Heating', 0):.2f} kg CO₂ ({user_data.get('heating_type', 'unknown')}, {user_data.get('heating_hours', 0)} hours)
 - Electricity: {breakdown.get('Electricity', 0):.2f} kg CO₂ ({user_data.get('electricity_kwh', 0)} kWh)
 - Consumption: {breakdown.get('Consumption', 0):.2f} kg CO₂
-"""
+""")
 
         if historical_stats and historical_stats.get('record_count', 0) > 0:
-            prompt += f"""
+            parts.append(f"""
 ## HISTORICAL TREND ({historical_stats.get('period_days', 30)} days)
 - Average Daily: {historical_stats.get('avg_daily_emissions', 0):.2f} kg CO₂
 - Best Day: {historical_stats.get('min_emissions', 0):.2f} kg CO₂
 - Worst Day: {historical_stats.get('max_emissions', 0):.2f} kg CO₂
 - Total Emissions: {historical_stats.get('total_emissions', 0):.1f} kg CO₂
 - Trend: {'Improving' if total < historical_stats.get('avg_daily_emissions', total) else 'Needs attention'}
-"""
+""")
 
-        prompt += f"""
+        parts.append(f"""
 ## YOUR TASK
 Provide a comprehensive, personalized sustainability analysis:
 
@@ -106,13 +387,13 @@ Provide a comprehensive, personalized sustainability analysis:
    - Be SPECIFIC to their actual usage (don't suggest generic advice)
    - Quantify potential CO₂ savings
    - Explain how it helps the climate
-   - Make it actionable (what exactly should they do?)"""
+   - Make it actionable (what exactly should they do?)""")
 
         if user_guidance:
-            prompt += f"""
-   - IMPORTANT: Pay special attention to the user's specific guidance and tailor your recommendations accordingly"""
+            parts.append(f"""
+   - IMPORTANT: Pay special attention to the user's specific guidance and tailor your recommendations accordingly""")
 
-        prompt += """
+        parts.append("""
 
 
 3. **Positive Recognition**
@@ -124,9 +405,9 @@ Provide a comprehensive, personalized sustainability analysis:
    - Inspire hope and agency
 
 Keep the tone encouraging, scientific, and action-oriented. Use data and numbers to make it concrete.
-"""
+""")
 
-        return prompt
+        return "".join(parts)
 
     def create_comparative_analysis_prompt(
         self,
@@ -139,6 +420,10 @@ Keep the tone encouraging, scientific, and action-oriented. Use data and numbers
         """
         change = current_total - previous_total
         change_pct = (change / previous_total * 100) if previous_total > 0 else 0
+        # One "- Category: value" line each; indented JSON spends prefill tokens on whitespace
+        category_lines = "\n".join(
+            f"- {category}: {value:.2f} kg CO₂" for category, value in categories.items()
+        )
 
         prompt = f"""You are a sustainability coach analyzing carbon footprint changes.
 
@@ -148,7 +433,7 @@ Keep the tone encouraging, scientific, and action-oriented. Use data and numbers
 - Change: {change:+.2f} kg CO₂/day ({change_pct:+.1f}%)
 
 ## CATEGORY BREAKDOWN
-{json.dumps(categories, indent=2)}
+{category_lines}
 
 ## YOUR TASK
 1. Analyze what drove the change (which categories changed most?)
@@ -160,6 +445,18 @@ Keep it brief (4-5 sentences), encouraging, and actionable.
 """
         return prompt
 
+    def create_quick_tips_prompt(
+        self,
+        total: float,
+        biggest_category: str,
+        user_guidance: Optional[str] = None
+    ) -> str:
+        """
+        Create a short prompt for quick, actionable tips
+        """
+        # The prompt shows one decimal, so totals that round the same share an entry
+        return _quick_tips_prompt(round(total, 1), biggest_category, user_guidance or None)
+
     def create_goal_setting_prompt(
         self,
         current_avg: float,
@@ -200,36 +497,47 @@ Keep it motivating and achievable. Break down big goals into manageable steps.
         climate_context: Dict,
         historical_stats: Optional[Dict] = None,
         location: Optional[str] = None,
-        user_guidance: Optional[str] = None
-    ) -> str:
+        user_guidance: Optional[str] = None,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
         """
         Main method to analyze carbon footprint
         """
         prompt = self.create_personalized_analysis_prompt(
             user_data, climate_context, historical_stats, location, user_guidance
         )
-        return self.generate_response(prompt)
+        return self._respond(prompt, stream)
 
     def compare_footprints(
         self,
         current_total: float,
         previous_total: float,
-        categories: Dict
-    ) -> str:
+        categories: Dict,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
         """
         Compare current vs previous footprint
         """
         prompt = self.create_comparative_analysis_prompt(
             current_total, previous_total, categories
         )
-        return self.generate_response(prompt)
+        return self._respond(prompt, stream)
 
-    def create_action_plan(self, current_avg: float, target: float = 6.0) -> str:
+    def create_action_plan(
+        self,
+        current_avg: float,
+        target: float = 6.0,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
         """
         Create a carbon reduction action plan
         """
         prompt = self.create_goal_setting_prompt(current_avg, target)
-        return self.generate_response(prompt)
+        return self._respond(prompt, stream)
+
+    def _respond(self, prompt: str, stream: bool) -> Union[str, Iterator[str]]:
+        """Return either the full response or a token stream"""
+        return self.stream_response(prompt) if stream else self.generate_response(prompt)
 
 
 if __name__ == "__main__":
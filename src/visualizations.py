@@ -1,15 +1,20 @@
 """
 Data visualization module using Plotly for interactive charts
+
+Chart builders called on every rerun are memoized on their inputs. They use
+st.cache_resource rather than st.cache_data because cache_data unpickles a
+copy of the figure on every hit, which is slower than rebuilding it. Callers
+must treat the returned figures as read-only.
 """
 
+import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-from typing import List, Dict
+import streamlit as st
 from datetime import datetime
-import pandas as pd
+from typing import Dict
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_emissions_breakdown_pie(breakdown: Dict) -> go.Figure:
     """
     Create a pie chart showing emissions breakdown by category
@@ -43,56 +48,70 @@ def create_emissions_breakdown_pie(breakdown: Dict) -> go.Figure:
     return fig
 
 
-def create_trend_chart(trend_data: List[Dict], target_line: float = 6.0) -> go.Figure:
+@st.cache_resource(max_entries=32, show_spinner=False)
+def create_trend_chart(trend_data, target_line: float = 6.0) -> go.Figure:
     """
     Create a line chart showing emissions trend over time
+    Takes the trend array from CarbonFootprintDB.get_trend_data or
+    get_dashboard_bundle: timestamp, total, then the five categories
     """
-    if not trend_data:
+    if len(trend_data) == 0:
         return None
 
-    df = pd.DataFrame(trend_data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.sort_values('timestamp')
-
-    fig = go.Figure()
-
-    # Main total emissions line
-    fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['total_emissions'],
-        mode='lines+markers',
-        name='Total Daily Emissions',
-        line=dict(color='#FF6B6B', width=3),
-        marker=dict(size=8),
-        fill='tozeroy',
-        fillcolor='rgba(255, 107, 107, 0.1)'
-    ))
+    # One float matrix, one column per series; missing values become NaN
+    data = np.asarray(trend_data, dtype=float)
 
-    # Paris Agreement target line
-    fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=[target_line] * len(df),
-        mode='lines',
-        name='Paris Agreement Target (1.5°C)',
-        line=dict(color='#2ECC71', width=2, dash='dash')
-    ))
+    # Epoch seconds to naive local time, matching how records were entered.
+    # Converted per row so each timestamp gets the UTC offset in force at that
+    # moment, not today's, across DST changes. Rows arrive in timestamp order
+    # from SQL, so no sort is needed
+    x = np.array([datetime.fromtimestamp(t) for t in data[:, 0]], dtype='datetime64[s]')
 
-    # Add category breakdown as stacked area
     categories = ['transport_emissions', 'diet_emissions', 'heating_emissions',
                   'electricity_emissions', 'consumption_emissions']
     colors = ['#3498DB', '#E74C3C', '#F39C12', '#9B59B6', '#1ABC9C']
 
-    for cat, color in zip(categories, colors):
-        if cat in df.columns:
-            fig.add_trace(go.Scatter(
-                x=df['timestamp'],
-                y=df[cat],
-                mode='lines',
-                name=cat.replace('_emissions', '').title(),
-                line=dict(width=1),
-                stackgroup='one',
-                fillcolor=color
-            ))
+    traces = [
+        # Main total emissions line
+        go.Scatter(
+            x=x,
+            y=data[:, 1],
+            mode='lines+markers',
+            name='Total Daily Emissions',
+            line=dict(color='#FF6B6B', width=3),
+            marker=dict(size=8),
+            fill='tozeroy',
+            fillcolor='rgba(255, 107, 107, 0.1)'
+        )
+    ]
+
+    # Category breakdown as stacked area
+    traces.extend(
+        go.Scatter(
+            x=x,
+            y=values,
+            mode='lines',
+            name=cat.replace('_emissions', '').title(),
+            line=dict(width=1),
+            stackgroup='one',
+            fillcolor=color
+        )
+        for cat, values, color in zip(categories, data[:, 2:].T, colors)
+    )
+
+    # Handing every trace to the constructor validates the figure once,
+    # instead of once per add_trace call
+    fig = go.Figure(data=traces)
+
+    # Paris Agreement target line
+    fig.add_hline(
+        y=target_line,
+        line_dash="dash",
+        line_color="#2ECC71",
+        line_width=2,
+        annotation_text="Paris Agreement Target (1.5°C)",
+        annotation_position="top left"
+    )
 
     fig.update_layout(
         title="Carbon Footprint Trend",
@@ -107,6 +126,7 @@ def create_trend_chart(trend_data: List[Dict], target_line: float = 6.0) -> go.F
     return fig
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_comparison_bar(user_avg: float, benchmarks: Dict) -> go.Figure:
     """
     Create a bar chart comparing user's average to global benchmarks
@@ -150,6 +170,7 @@ def create_comparison_bar(user_avg: float, benchmarks: Dict) -> go.Figure:
     return fig
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_progress_gauge(current: float, target: float = 6.0) -> go.Figure:
     """
     Create a gauge chart showing progress toward target
@@ -189,6 +210,7 @@ def create_progress_gauge(current: float, target: float = 6.0) -> go.Figure:
     return fig
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_category_comparison(current: Dict, average: Dict) -> go.Figure:
     """
     Create a grouped bar chart comparing current vs average emissions by category
@@ -213,6 +235,7 @@ def create_category_comparison(current: Dict, average: Dict) -> go.Figure:
     return fig
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_atmospheric_co2_indicator(co2_ppm: float) -> go.Figure:
     """
     Create an indicator showing current atmospheric CO2 levels
@@ -238,6 +261,7 @@ def create_atmospheric_co2_indicator(co2_ppm: float) -> go.Figure:
     return fig
 
 
+@st.cache_resource(max_entries=32, show_spinner=False)
 def create_summary_metrics_chart(stats: Dict) -> go.Figure:
     """
     Create a summary chart with key metrics
@@ -245,37 +269,54 @@ def create_summary_metrics_chart(stats: Dict) -> go.Figure:
     if stats.get('record_count', 0) == 0:
         return None
 
-    fig = make_subplots(
-        rows=1, cols=3,
-        subplot_titles=('Average', 'Best Day', 'Worst Day'),
-        specs=[[{'type': 'indicator'}, {'type': 'indicator'}, {'type': 'indicator'}]]
-    )
-
-    fig.add_trace(go.Indicator(
-        mode="number",
-        value=stats.get('avg_daily_emissions', 0),
-        title={'text': "Avg Daily", 'font': {'size': 14}},
-        number={'suffix': " kg CO₂", 'font': {'size': 24}},
-    ), row=1, col=1)
-
-    fig.add_trace(go.Indicator(
-        mode="number",
-        value=stats.get('min_emissions', 0),
-        title={'text': "Best Day", 'font': {'size': 14}},
-        number={'suffix': " kg CO₂", 'font': {'size': 24}, 'font.color': 'green'},
-    ), row=1, col=2)
-
-    fig.add_trace(go.Indicator(
-        mode="number",
-        value=stats.get('max_emissions', 0),
-        title={'text': "Worst Day", 'font': {'size': 14}},
-        number={'suffix': " kg CO₂", 'font': {'size': 24}, 'font.color': 'red'},
-    ), row=1, col=3)
-
-    fig.update_layout(
-        height=200,
-        margin=dict(t=60, b=20, l=20, r=20),
-        showlegend=False
+    # One row of three number indicators, each in its own paper domain; the
+    # same layout make_subplots would produce, without building a subplot grid
+    # (its default horizontal_spacing is 0.2 / cols)
+    spacing = 0.2 / 3
+    width = (1 - 2 * spacing) / 3
+    domains = tuple([i * (width + spacing), i * (width + spacing) + width] for i in range(3))
+
+    fig = go.Figure(
+        data=[
+            go.Indicator(
+                mode="number",
+                value=stats.get('avg_daily_emissions', 0),
+                title={'text': "Avg Daily", 'font': {'size': 14}},
+                number={'suffix': " kg CO₂", 'font': {'size': 24}},
+                domain={'x': domains[0], 'y': [0.0, 1.0]}
+            ),
+            go.Indicator(
+                mode="number",
+                value=stats.get('min_emissions', 0),
+                title={'text': "Best Day", 'font': {'size': 14}},
+                number={'suffix': " kg CO₂", 'font': {'size': 24, 'color': 'green'}},
+                domain={'x': domains[1], 'y': [0.0, 1.0]}
+            ),
+            go.Indicator(
+                mode="number",
+                value=stats.get('max_emissions', 0),
+                title={'text': "Worst Day", 'font': {'size': 14}},
+                number={'suffix': " kg CO₂", 'font': {'size': 24, 'color': 'red'}},
+                domain={'x': domains[2], 'y': [0.0, 1.0]}
+            )
+        ],
+        layout=dict(
+            # Column headings above each indicator
+            annotations=[
+                dict(
+                    text=title,
+                    x=(x0 + x1) / 2, y=1.0,
+                    xref='paper', yref='paper',
+                    xanchor='center', yanchor='bottom',
+                    showarrow=False,
+                    font=dict(size=16)
+                )
+                for title, (x0, x1) in zip(('Average', 'Best Day', 'Worst Day'), domains)
+            ],
+            height=200,
+            margin=dict(t=60, b=20, l=20, r=20),
+            showlegend=False
+        )
     )
 
     return fig
@@ -0,0 +1,102 @@
+"""
+Tests for the SQLite footprint store
+
+Run from the project root with: python -m unittest
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src.services.database import CarbonFootprintDB
+
+
+class FootprintIdTest(unittest.TestCase):
+    """Ids are assigned inside the write transaction"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'footprint.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_interleaved_saves_from_separate_connections(self):
+        db_a = CarbonFootprintDB(self.db_path)
+        db_b = CarbonFootprintDB(self.db_path)
+        self.addCleanup(db_a.close)
+        self.addCleanup(db_b.close)
+
+        # A holds the write lock while B saves; B must wait for A's commit
+        # before reading MAX(id), not read it up front and collide
+        db_a._conn.execute('BEGIN IMMEDIATE')
+
+        result = {}
+
+        def save_b():
+            try:
+                result['id'] = db_b.save_footprint({'total_emissions': 2.0})
+            except Exception as e:
+                result['error'] = e
+
+        writer = threading.Thread(target=save_b)
+        writer.start()
+        time.sleep(0.2)
+
+        db_a._conn.execute(
+            'INSERT INTO footprint_records (id, timestamp, total_emissions) VALUES (1, 0, 1.0)'
+        )
+        db_a._conn.commit()
+        writer.join(timeout=10)
+
+        self.assertNotIn('error', result)
+        self.assertEqual(result['id'], 2)
+        self.assertEqual(db_a.save_footprint({'total_emissions': 3.0}), 3)
+
+
+class FootprintValuesTest(unittest.TestCase):
+    """Every field of a calculation lands in the column of the same name"""
+
+    # A distinct value per column, so any two swapped fields are caught
+    RECORD = {
+        'timestamp': 1700000000,
+        'total_emissions': 12.5,
+        'transport_emissions': 4.25,
+        'diet_emissions': 3.5,
+        'heating_emissions': 2.75,
+        'electricity_emissions': 1.5,
+        'consumption_emissions': 0.5,
+        'transport_mode': 'car_petrol',
+        'distance_km': 42.0,
+        'diet_type': 'vegetarian',
+        'heating_type': 'natural_gas',
+        'heating_hours': 6.0,
+        'electricity_kwh': 9.5,
+        'grid_carbon_intensity': 0.233,
+        'atmospheric_co2_ppm': 421.7,
+        'notes': 'round trip'
+    }
+
+    def setUp(self):
+        self.db = CarbonFootprintDB(':memory:')
+        self.addCleanup(self.db.close)
+
+    def assertStored(self, record_id):
+        row = self.db.get_recent_records(1)[0]
+        self.assertEqual(row['id'], record_id)
+        for column, value in self.RECORD.items():
+            with self.subTest(column=column):
+                self.assertEqual(row[column], value)
+
+    def test_save_footprint_round_trip(self):
+        self.assertStored(self.db.save_footprint(self.RECORD))
+
+    def test_save_footprints_bulk_round_trip(self):
+        self.assertEqual(self.db.save_footprints_bulk([self.RECORD]), 1)
+        self.assertStored(1)
+
+
+if __name__ == '__main__':
+    unittest.main()